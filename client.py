@@ -6,7 +6,7 @@ from Models.response import Response
 
 class Client:
     """
-    This is a class for connecting to the server's database and to read, add, delete or query entries (key-value pairs).
+    This is a class for connecting to the server's database and to read, add, delete, query or watch entries (key-value pairs).
     It establishes a TCP connection with the server.
     It communicates with the server using Request and Response objects sent and received via TCP Sockets.
 
@@ -53,6 +53,100 @@ class Client:
         Response(success=True, message=None, collection_name=age, data=[(1, 20)])
         >>> client.query("read value >= int ( 20 ) from age")
         Response(success=True, message=None, collection_name=age, data=[(2, 25), (1, 20)])
+        >>> client.query("count value >= int ( 20 ) from age")
+        Response(success=True, message=None, collection_name=age, data=2)
+        >>> client.query("sum value from age")
+        Response(success=True, message=None, collection_name=age, data=45)
+        >>> client.query("avg value < int ( 30 ) from age")
+        Response(success=True, message=None, collection_name=age, data=22.5)
+        >>> client.query("min value > int ( 30 ) from age")
+        Response(success=True, message=None, collection_name=age, data=None)
+        >>> client.query("max key from age")
+        Response(success=True, message=None, collection_name=age, data=2)
+        >>> client.add("age", 3, 25)
+        Response(success=True, message=None, collection_name=age, data=[(3, 25)])
+        >>> client.query("count key from age group by value")
+        Response(success=True, message=None, collection_name=age, data={25: 2, 20: 1})
+        >>> client.add("age", 4, "unknown")
+        Response(success=True, message=None, collection_name=age, data=[(4, 'unknown')])
+        >>> client.query("sum value from age")
+        Response(success=True, message=1 entries were skipped., collection_name=age, data=70)
+        >>> from decimal import Decimal
+        >>> client.create_collection("prices")
+        Response(success=True, message=None, collection_name=prices, data=None)
+        >>> client.add("prices", 1, Decimal("1"))
+        Response(success=True, message=None, collection_name=prices, data=[(1, Decimal('1'))])
+        >>> client.add("prices", 2, 1.5)
+        Response(success=True, message=None, collection_name=prices, data=[(2, 1.5)])
+        >>> client.query("sum value from prices")
+        Response(success=True, message=1 entries were skipped., collection_name=prices, data=1.5)
+        >>> client.delete("prices", 1)
+        Response(success=True, message=None, collection_name=prices, data=None)
+        >>> client.add("prices", 1, Decimal("1"))
+        Response(success=True, message=None, collection_name=prices, data=[(1, Decimal('1'))])
+        >>> client.query("sum value from prices")
+        Response(success=True, message=1 entries were skipped., collection_name=prices, data=1.5)
+        >>> client.query("min value from prices")
+        Response(success=True, message=None, collection_name=prices, data=1)
+        >>> client.query("avg value < int ( 2 ) from prices group by key")
+        Response(success=True, message=None, collection_name=prices, data={2: 1.5, 1: Decimal('1')})
+        >>> client.add("firstName", 3, "Ramona")
+        Response(success=True, message=None, collection_name=firstName, data=[(3, 'Ramona')])
+        >>> client.query("read value startswith Ra from firstName")
+        Response(success=True, message=None, collection_name=firstName, data=[(1, 'Radu'), (3, 'Ramona')])
+        >>> client.query("read value contains mon from firstName")
+        Response(success=True, message=None, collection_name=firstName, data=[(3, 'Ramona')])
+        >>> client.query("delete value contains adu from firstName")
+        Response(success=True, message=None, collection_name=firstName, data=[(1, 'Radu')])
+        >>> client.query("count value startswith Ra from firstName")
+        Response(success=True, message=None, collection_name=firstName, data=1)
+        >>> client.query("read value startswith On from lastName")
+        Response(success=True, message=None, collection_name=lastName, data=[(1, 'Onescu')])
+        >>> cursor = client.watch("lastName").data
+        >>> cursor["sequence"], cursor["events"]
+        (1, [])
+        >>> client.add("lastName", 2, "Doe")
+        Response(success=True, message=None, collection_name=lastName, data=[(2, 'Doe')])
+        >>> client.add("lastName", 5, "Smith")
+        Response(success=True, message=None, collection_name=lastName, data=[(5, 'Smith')])
+        >>> client.delete("lastName", 2)
+        Response(success=True, message=None, collection_name=lastName, data=None)
+        >>> client.watch("lastName", cursor["generation"], 1).data["events"]
+        [(2, 'add', 2, 'Doe'), (3, 'add', 5, 'Smith'), (4, 'delete', 2, None)]
+        >>> client.watch("lastName", cursor["generation"], 2, (3, 10)).data["events"]
+        [(3, 'add', 5, 'Smith')]
+        >>> client.watch("lastName", cursor["generation"], 4).data["events"]
+        []
+        >>> client.watch("lastName", cursor["generation"], 9)
+        Response(success=False, message=Events are no longer available., collection_name=None, data=None)
+        >>> client.watch("lastName", cursor["generation"], "4")
+        Response(success=False, message=Invalid cursor., collection_name=None, data=None)
+        >>> client.watch("lastName", sequence=2)
+        Response(success=False, message=Invalid cursor., collection_name=None, data=None)
+        >>> client.watch("lastName", cursor["generation"], 2, 5)
+        Response(success=False, message=Invalid key range., collection_name=None, data=None)
+        >>> client.delete_collection("lastName")
+        Response(success=True, message=None, collection_name=None, data=None)
+        >>> client.create_collection("lastName")
+        Response(success=True, message=None, collection_name=lastName, data=None)
+        >>> client.add("lastName", 3, "Doe")
+        Response(success=True, message=None, collection_name=lastName, data=[(3, 'Doe')])
+        >>> client.watch("lastName", cursor["generation"], 0)
+        Response(success=False, message=Events are no longer available., collection_name=None, data=None)
+        >>> cursor = client.watch("lastName").data
+        >>> for key in range(100, 160):
+        ...     _ = client.add("lastName", key, "Doe")
+        >>> page = client.watch("lastName", cursor["generation"], cursor["sequence"]).data
+        >>> len(page["events"]), page["sequence"]
+        (20, 21)
+        >>> events = page["events"]
+        >>> while page["events"]:
+        ...     page = client.watch("lastName", page["generation"], page["sequence"]).data
+        ...     events += page["events"]
+        >>> len(events), events[-1], page["sequence"]
+        (60, (61, 'add', 159, 'Doe'), 61)
+        >>> client.read("lastName", 159)
+        Response(success=True, message=None, collection_name=lastName, data=[(159, 'Doe')])
     """
 
     def __init__(self, host, port):
@@ -133,18 +227,24 @@ class Client:
                             Accepted formats: 
                                 - "[ACTION] [ELEMENT] [OPERATOR] [VALUE] from [COLLECTION]" or "[ACTION] [ELEMENT] [OPERATOR] [DATATYPE] ( [VALUE] ) from [COLLECTION]"
                                 - "JOIN [COLLECTION] with [COLLECTION]"
+                                - "[AGGREGATE] [ELEMENT] ([OPERATOR] [VALUE]) from [COLLECTION] (group by [ELEMENT])"
                             [ACTION] can be "read" or "delete"
+                            [AGGREGATE] can be "count", "sum", "min", "max" or "avg"
                             [ELEMENT] can be "value" or "key"
-                            [OPERATOR] can be "<", ">", "=", "<=", ">=", "contains"
+                            [OPERATOR] can be "<", ">", "=", "<=", ">=", "contains", "startswith"
                             [DATATYPE] can be "int", "float", "complex", "str".
                             [VALUE] is the value on which the query will be done.
                             [COLLECTION] is the name of the collection on which the query will be done.
                             Examples: "read key > 1234 from cars"
                                       "read value < int ( 4 ) from computers"
+                                      "count value > int ( 10 ) from orders"
+                                      "sum value from orders group by key"
                             Note: If no datatype is provided, the value will have the String data type by default.
+                            Note: The filter and the group by clause of an aggregate query are optional.
 
         Returns:
             Response(success=True, message=None, data=[(...)]): If the query action was succesful. Note: The data list will contain the entries matching the query.
+                                                                For aggregate queries data will contain the aggregated value (or a dictionary of aggregated values per group).
             Response(success=False, message=Invalid query syntax., data=None): If the query action was not succesful.
         """
         request = Request(3, None, None, None, query)
@@ -187,6 +287,33 @@ class Client:
         self.client_socket.send(request)
         return self._listen_for_response()
 
+    def watch(self, collection_name, generation=None, sequence=None, key_range=None):
+        """
+        The method returns the events (added and deleted entries) of the given collection that happened after the given generation and sequence number.
+        It sends a request to the server and waits for the response.
+        Note: Call it without a generation and a sequence number to get the cursor from which to start watching, then call it again with the generation and the sequence number from the last response to get the new events.
+              After a reconnect the client can resume watching from the last generation and sequence number it received.
+
+        Parameters:
+            collection_name (String): The name of the collection.
+            generation (String): The generation of the change log, received with the last events.
+            sequence (Int): The sequence number of the last event received.
+            key_range (Tuple): The lowest and the highest key (inclusive) of the events that will be returned. If None, all the events are returned.
+
+        Returns:
+            Response(success=True, message=None, collection_name=THE GIVEN COLLECTION NAME, data={"generation": ..., "sequence": ..., "events": [(...)]}): If the watch action was succesful. Note: The events list will contain (sequence, action, key, value) tuples, the action being "add" or "delete".
+                                                                                                                                                        At most one batch of events (see the server's watch batch_size) is returned, so the client should keep watching from the returned sequence until no events are returned.
+            Response(success=False, message=Events are no longer available., collection_name=None, data=None): If the client fell too far behind or the change log was recreated (the server restarted or the collection was recreated). Note: The collection should be read again and watched from the latest cursor.
+            Response(success=False, message=Invalid cursor., collection_name=None, data=None): If only one of the generation and the sequence number is given or the sequence number is not an integer.
+            Response(success=False, message=Invalid key range., collection_name=None, data=None): If the key range is not a (lowest key, highest key) tuple.
+            Response(success=False, message=Collection does not exist., collection_name=None, data=None): If the collection does not exist.
+        """
+        cursor = None if generation is None and sequence is None else (generation, sequence)
+        request = Request(6, collection_name, key_range, cursor, None)
+        request = pickle.dumps(request)
+        self.client_socket.send(request)
+        return self._listen_for_response()
+
     def _listen_for_response(self):
         """
         The method waits and listens for a response from the server.
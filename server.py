@@ -2,13 +2,17 @@ import socket
 import pickle
 import operator
 import os
+import uuid
 from Models.request import Request
 from Models.response import Response
+from text_index import TextIndex
 from apscheduler.schedulers.background import BackgroundScheduler
 from configparser import ConfigParser
-from pyparsing import Keyword, Word, Literal, printables, alphas
-from itertools import chain
-from collections import defaultdict
+from pyparsing import Keyword, Word, Literal, Optional, printables, alphas
+from itertools import chain, islice
+from collections import defaultdict, deque
+from numbers import Number, Real
+from decimal import Decimal
 
 
 class Server():
@@ -21,7 +25,9 @@ class Server():
         - Initializes a key-value pair database based on the given collections' filenames in the config file.
         - Initializes a TCP Socket Server bound to the given host and port in the config file. (default hostname and port: 127.0.0.1:65535)
         - On initialization it reads the collection files if they exists.
-        - Provides read, add, delete, query and join functionalities for the database.
+        - Provides read, add, delete, query, join and aggregate (count, sum, min, max, avg) functionalities for the database.
+        - Keeps a text index, for the collections given in the config file, that speeds up the "contains" and "startswith" queries.
+        - Keeps a bounded change log (add and delete events with sequence numbers) for every collection, that clients can watch instead of re-reading the collections.
         - Creates a snapshot of the collections (the key-value pair dictionaries) at a given time based on the interval value from the config file. (default: every 60 mins)
 
     Attributes:
@@ -29,7 +35,14 @@ class Server():
         host (String): The host on which the server is bound.
         port (Int): The port on which the server is bound.
         collection_names (List): List containing all the collections' names.
+        text_index_names (List): List containing the names of the collections that have a text index.
+        text_indexes (dict): The dictionary object that contains the text index of each indexed collection.
         snapshot_interval (Int): The interval on which the snapshot is created.
+        change_logs (dict): The dictionary object that contains the change log (the latest events) of each collection.
+        sequences (dict): The dictionary object that contains the sequence number of the latest event of each collection.
+        generations (dict): The dictionary object that contains the generation (a random token created with the change log) of each collection's change log.
+        change_log_size (Int): The maximum number of events kept in each change log. (default: 1000)
+        watch_batch_size (Int): The maximum number of events returned by a watch request. (default: 20)
         server_socket: The server's TCP Socket.
 
     """
@@ -58,6 +71,14 @@ class Server():
             except IOError:
                 self.collections[collection_name] = {}
 
+        self.text_indexes = {}
+        self.change_logs = {}
+        self.sequences = {}
+        self.generations = {}
+        for collection_name in self.collections:
+            self._create_text_index(collection_name)
+            self._create_change_log(collection_name)
+
     def _start_server(self):
         """
         The method creates a socket bounded to the given host and port and listens for an incoming client connection.
@@ -97,9 +118,11 @@ class Server():
                         3: lambda: self._query(request.query),
                         4: lambda: self._create_collection(request.collection_name),
                         5: lambda: self._delete_collection(request.collection_name),
-                        6: lambda: self._send_error("Request type does not exist.")
+                        6: lambda: self._watch(request.collection_name, request.value, request.key),
+                        7: lambda: self._send_error("Request type does not exist.")
                     }
-                    response = request_types.get(request.request_type, 6)()
+                    response = request_types.get(
+                        request.request_type, request_types[7])()
                     response = pickle.dumps(response)
                     client_socket.send(response)
                 else:  # client disconnected
@@ -122,6 +145,8 @@ class Server():
                 self.collections[collection_name]
             except:
                 self.collections[collection_name] = {}
+                self._create_text_index(collection_name)
+                self._create_change_log(collection_name)
                 return Response(True, None, collection_name, None)
             else:
                 return self._send_error("Collection already exists.")
@@ -141,6 +166,10 @@ class Server():
         """
         try:
             del self.collections[collection_name]
+            self.text_indexes.pop(collection_name, None)
+            del self.change_logs[collection_name]
+            del self.sequences[collection_name]
+            del self.generations[collection_name]
             return Response(True, None, None, None)
         except KeyError:
             pass
@@ -183,7 +212,13 @@ class Server():
         """
         if self._collection_exists(collection_name):
             try:
+                if key in self.collections[collection_name]:
+                    self._update_text_index(
+                        "replace", collection_name, key, self.collections[collection_name][key], value)
+                else:
+                    self._update_text_index("add", collection_name, key, value)
                 self.collections[collection_name][key] = value
+                self._log_change("add", key, value, collection_name)
                 return Response(True, None, collection_name, [(key, self.collections[collection_name][key])])
             except:
                 return self._send_error("Entry could not be added.")
@@ -205,7 +240,10 @@ class Server():
         """
         if self._collection_exists(collection_name):
             try:
+                self._update_text_index(
+                    "remove", collection_name, key, self.collections[collection_name][key])
                 del self.collections[collection_name][key]
+                self._log_change("delete", key, None, collection_name)
                 return Response(True, None, collection_name,  None)
             except:
                 return self._send_error("Entry could not be deleted.")
@@ -239,6 +277,7 @@ class Server():
 
         Returns:
             Response(success=True, message=None, collection_name=THE COLLECTION NAME, data=[(...)]): If the query action was succesful. Note: The data list will contain the entries matching the query.
+                                                                                            For aggregate queries data will contain the aggregated value (or a dictionary of aggregated values per group).
             Response(success=False, message=Invalid query syntax., collection_name=None, data=None): If the query action was not succesful.
         """
         try:
@@ -258,15 +297,15 @@ class Server():
 
                 return Response(True, None, [query["collection1"], query["collection2"]], dict(matches))
 
+            elif query["action"] in ("count", "sum", "min", "max", "avg"):  # AGGREGATE ACTION
+                result, skipped = self._execute_aggregate_query(
+                    query, self._query_operators(), query["collection1"])
+
+                message = f"{skipped} entries were skipped." if skipped else None
+                return Response(True, message, query["collection1"], result)
+
             else:  # QUERY ACTION (READ | DELETE)
-                operators = {
-                    ">": operator.gt,
-                    "<": operator.lt,
-                    "=": operator.eq,
-                    "<=": operator.le,
-                    ">=": operator.ge,
-                    "contains": operator.contains,
-                }
+                operators = self._query_operators()
 
                 query_elements = {
                     "key": self._execute_query_by_key,
@@ -289,6 +328,23 @@ class Server():
             print(e)
             return self._send_error("Invalid query syntax.")
 
+    def _query_operators(self):
+        """
+        The method returns the operators that can be used in a query.
+
+        Returns:
+           A dictionary mapping each query operator to its function.
+        """
+        return {
+            ">": operator.gt,
+            "<": operator.lt,
+            "=": operator.eq,
+            "<=": operator.le,
+            ">=": operator.ge,
+            "contains": operator.contains,
+            "startswith": lambda value, prefix: value.startswith(prefix),
+        }
+
     def _parse_query_string(self, query):
         """
         The method checks the format and parses the given query.
@@ -298,15 +354,20 @@ class Server():
                             Accepted formats: 
                                 - "[ACTION] [ELEMENT] [OPERATOR] [VALUE] from [COLLECTION]" or "[ACTION] [ELEMENT] [OPERATOR] [DATATYPE] ( [VALUE] ) from [COLLECTION]"
                                 - "JOIN [COLLECTION] with [COLLECTION]"
+                                - "[AGGREGATE] [ELEMENT] ([OPERATOR] [VALUE]) from [COLLECTION] (group by [ELEMENT])"
                             [ACTION] can be "read" or "delete"
+                            [AGGREGATE] can be "count", "sum", "min", "max" or "avg"
                             [ELEMENT] can be "value" or "key"
-                            [OPERATOR] can be "<", ">", "=", "<=", ">=", "contains"
+                            [OPERATOR] can be "<", ">", "=", "<=", ">=", "contains", "startswith"
                             [DATATYPE] can be "int", "float", "complex", "str".
                             [VALUE] is the value on which the query will be done.
                             [COLLECTION] is the name of the collection on which the query will be done.
                             Examples: "read key > 1234 from cars"
                                       "read value < int ( 4 ) from computers"
+                                      "count value > int ( 10 ) from orders"
+                                      "sum value from orders group by key"
                             Note: If no datatype is provided, the value will have the String data type by default.
+                            Note: The filter and the group by clause of an aggregate query are optional.
 
         Returns:
            query (List): A list containing the parsed query string.
@@ -316,7 +377,7 @@ class Server():
         ELEMENT = Keyword("key")("element") | Keyword("value")("element")
 
         OPERATOR = Keyword("<=")("operator") | Keyword(">=")("operator") | Keyword("<")("operator") | Keyword(">")("operator") | Keyword(
-            "=")("operator") | Keyword("contains")("operator")
+            "=")("operator") | Keyword("contains")("operator") | Keyword("startswith")("operator")
 
         VALUE = (Word(printables)("value_type") +
                  "(" + Word(printables)("value") + ")") | Word(printables)("value")
@@ -327,7 +388,16 @@ class Server():
         SYNTAX_JOIN = Keyword("join")("action") + Word(alphas)("collection1") + "with" + Word(
             alphas)("collection2")
 
-        SYNTAX = SYNTAX_JOIN | SYNTAX_QUERY
+        ACTION_AGGREGATE = Keyword("count")("action") | Keyword("sum")("action") | Keyword(
+            "min")("action") | Keyword("max")("action") | Keyword("avg")("action")
+
+        GROUP_BY = Keyword("group") + Keyword("by") + \
+            (Keyword("key")("group_by") | Keyword("value")("group_by"))
+
+        SYNTAX_AGGREGATE = ACTION_AGGREGATE + ELEMENT + Optional(OPERATOR + VALUE) + \
+            "from" + Word(alphas)("collection1") + Optional(GROUP_BY)
+
+        SYNTAX = SYNTAX_JOIN | SYNTAX_AGGREGATE | SYNTAX_QUERY
 
         query = SYNTAX.parseString(query)
 
@@ -366,11 +436,16 @@ class Server():
             operators (Dict): A dictionary containing the operators that will be used.
             collection_name: The name of the collection on which the query will be executed.
 
+        Note: If the collection has a text index, the "contains" and "startswith" queries will only check the entries found in the index.
+
         Returns:
            A list containing all the entries that match the query.
         """
         matches = []
-        for key, value in self.collections[collection_name].copy().items():
+        entries = self._text_index_entries(query, collection_name)
+        if entries is None:
+            entries = self.collections[collection_name].copy().items()
+        for key, value in entries:
             try:
                 if operators[query["operator"]](value, query["value"]):
                     matches.append((key, value))
@@ -411,6 +486,175 @@ class Server():
                     pass
         return matches
 
+    def _execute_aggregate_query(self, query, operators, collection_name):
+        """
+        The method aggregates the entries of the given collection in a single pass, using the given query.
+        Only the entries matching the optional filter are aggregated and only the aggregated result is returned.
+        Note: If the filter is on the key with the "=" operator the method will access the entry, using the key, right away.
+        Note: Entries whose element can not be aggregated are skipped, whatever their position in the collection:
+              "sum" and "avg" only aggregate numbers (Decimals can not be added to the other numbers, so if there are both, the Decimals are skipped), "min" and "max" only aggregate real numbers (Decimals included) and strings (if there are both, the strings are skipped).
+              Entries whose group (key or value) is not hashable are skipped as well.
+
+        Parameters:
+            query (List): A list containing the parsed query string.
+            operators (Dict): A dictionary containing the operators that will be used.
+            collection_name: The name of the collection on which the query will be executed.
+
+        Returns:
+           A tuple containing the aggregated value (or, if the query is grouped, a dictionary containing the aggregated value of each group) and the number of skipped entries.
+           Note: "count" and "sum" return 0 and "min", "max" and "avg" return None if no entry matches the query.
+        """
+        aggregates = {
+            "count": lambda result, element: (result or 0) + 1,
+            "sum": self._fold_sum,
+            "min": lambda result, element: self._fold_extreme(result, element, min),
+            "max": lambda result, element: self._fold_extreme(result, element, max),
+            "avg": self._fold_sum
+        }
+
+        validators = {
+            "count": lambda element: True,
+            "sum": lambda element: isinstance(element, Number),
+            "min": lambda element: isinstance(element, (Real, Decimal, str)),
+            "max": lambda element: isinstance(element, (Real, Decimal, str)),
+            "avg": lambda element: isinstance(element, Number)
+        }
+
+        finalizers = {
+            "count": lambda result: result or 0,
+            "sum": lambda result: 0 if result is None else result[0] if result[1] else result[2],
+            "min": lambda result: None if result is None else result[0] if result[0] is not None else result[1],
+            "max": lambda result: None if result is None else result[0] if result[0] is not None else result[1],
+            "avg": self._average
+        }
+
+        collection = self.collections[collection_name]
+        position = 0 if query["element"] == "key" else 1
+        group_position = 0 if query.get("group_by") == "key" else 1
+
+        if "operator" not in query:
+            entries = collection.items()
+        elif query["element"] == "key" and query["operator"] == "=":
+            entries = [(query["value"], collection[query["value"]])
+                       ] if query["value"] in collection else []
+        else:
+            entries = self._text_index_entries(query, collection_name)
+            if entries is None:
+                entries = collection.items()
+            entries = self._filter_entries(
+                entries, operators[query["operator"]], position, query["value"])
+
+        aggregate = aggregates[query["action"]]
+        is_valid = validators[query["action"]]
+
+        results = {}
+        skipped = 0
+        for entry in entries:
+            group = entry[group_position] if "group_by" in query else None
+            try:
+                hash(group)
+            except TypeError:
+                skipped += 1
+                continue
+
+            if not is_valid(entry[position]):
+                skipped += 1
+                continue
+
+            try:
+                results[group] = aggregate(
+                    results.get(group), entry[position])
+            except (TypeError, ArithmeticError):
+                skipped += 1
+
+        if query["action"] in ("min", "max"):  # strings are skipped when numbers were found
+            skipped += sum(result[2] for result in results.values()
+                           if result[0] is not None)
+        elif query["action"] in ("sum", "avg"):  # Decimals are skipped when other numbers were found
+            skipped += sum(result[3] for result in results.values()
+                           if result[1])
+
+        finalize = finalizers[query["action"]]
+        if "group_by" in query:
+            return {group: finalize(result) for group, result in results.items()}, skipped
+        return finalize(results.get(None)), skipped
+
+    def _fold_extreme(self, result, element, extreme):
+        """
+        The method folds the given element into the running result of a "min" or "max" aggregate.
+        Real numbers and strings are compared separately, so the result does not depend on the order of the entries.
+
+        Parameters:
+            result (Tuple): The running (number, string, number of strings) result or None.
+            element (Real number, Decimal or String): The element that will be folded in.
+            extreme (Function): min or max.
+
+        Returns:
+           The new (number, string, number of strings) result.
+        """
+        number, string, strings = result or (None, None, 0)
+        if isinstance(element, str):
+            string = element if string is None else extreme(string, element)
+            strings += 1
+        else:
+            number = element if number is None else extreme(number, element)
+        return (number, string, strings)
+
+    def _fold_sum(self, result, element):
+        """
+        The method folds the given element into the running result of a "sum" or "avg" aggregate.
+        Decimals and the other numbers are added separately, so the result does not depend on the order of the entries.
+
+        Parameters:
+            result (Tuple): The running (sum, count, Decimals' sum, Decimals' count) result or None.
+            element (Number): The element that will be folded in.
+
+        Returns:
+           The new (sum, count, Decimals' sum, Decimals' count) result.
+        """
+        total, count, decimal_total, decimals = result or (0, 0, Decimal(0), 0)
+        if isinstance(element, Decimal):
+            return (total, count, decimal_total + element, decimals + 1)
+        return (total + element, count + 1, decimal_total, decimals)
+
+    def _average(self, result):
+        """
+        The method computes the average from the running result of an "avg" aggregate.
+        Note: The Decimals' average is only returned if there are no other numbers.
+
+        Parameters:
+            result (Tuple): The running (sum, count, Decimals' sum, Decimals' count) result or None.
+
+        Returns:
+           The average, or None if there is no result or it can not be computed (e.g. the sum is too large to be divided).
+        """
+        if result is None:
+            return None
+        try:
+            return result[0] / result[1] if result[1] else result[2] / result[3]
+        except ArithmeticError:
+            return None
+
+    def _filter_entries(self, entries, query_operator, position, value):
+        """
+        The method yields the entries for which the given operator, applied to their key or value and the given value, holds.
+
+        Parameters:
+            entries (Iterable): The (key, value) entries that will be filtered.
+            query_operator (Function): The operator used to compare the entries.
+            position (Int): 0 to compare the entries' keys, 1 to compare their values.
+            value: The value to which the entries are compared.
+
+        Returns:
+           A generator yielding the matching entries.
+        """
+        for entry in entries:
+            try:
+                if query_operator(entry[position], value):
+                    yield entry
+            except:
+                pass
+
     def _delete_from_query(self, key, collection_name):
         """
         The method deletes an entry from the given collection using the given key.
@@ -419,7 +663,133 @@ class Server():
             key: The key of the database entry.
             collection_name: The name of the collection.
         """
+        self._update_text_index(
+            "remove", collection_name, key, self.collections[collection_name][key])
         del self.collections[collection_name][key]
+        self._log_change("delete", key, None, collection_name)
+
+    def _create_text_index(self, collection_name):
+        """
+        The method creates the text index of the given collection, if the collection is set to be indexed in the config file.
+
+        Parameters:
+            collection_name: The name of the collection.
+        """
+        if collection_name in self.text_index_names:
+            self.text_indexes[collection_name] = TextIndex(
+                self.collections[collection_name])
+
+    def _update_text_index(self, action, collection_name, *arguments):
+        """
+        The method adds, replaces or removes an entry in the text index of the given collection, if the collection has one.
+
+        Parameters:
+            action (String): The action that will be done on the index. Can be "add", "replace" or "remove".
+            collection_name: The name of the collection.
+            arguments: The arguments of the index's action: the key and the value of the database entry ("replace" takes the key, the old value and the new value).
+        """
+        text_index = self.text_indexes.get(collection_name)
+        if text_index is not None:
+            getattr(text_index, action)(*arguments)
+
+    def _text_index_entries(self, query, collection_name):
+        """
+        The method uses the text index of the given collection to find the entries that might match the given value query.
+
+        Parameters:
+            query (List): A list containing the parsed query string.
+            collection_name: The name of the collection on which the query will be executed.
+
+        Returns:
+           A list containing the candidate entries, in the collection's order, that still have to be checked against the query.
+           None: If the collection has no text index or the index can not be used for the query.
+        """
+        text_index = self.text_indexes.get(collection_name)
+        if text_index is None or query["element"] != "value" or query["operator"] not in ("contains", "startswith") \
+                or not isinstance(query["value"], str):
+            return None
+
+        collection = self.collections[collection_name]
+        return [(key, collection[key]) for key in text_index.candidates(query["operator"], query["value"])]
+
+    def _watch(self, collection_name, cursor, key_range):
+        """
+        The method returns the events (added and deleted entries) of the given collection that happened after the given cursor.
+        Note: If no cursor is given, no events are returned, only the generation and the sequence number of the latest event, from which the client can start watching.
+        Note: Each collection keeps only its latest events, so a client that falls too far behind has to read the collection again and watch it from the latest sequence number.
+        Note: The sequence numbers are only valid within a generation of the change log. A new generation is created when the server starts and when the collection is recreated.
+        Note: At most watch_batch_size events are returned, together with the sequence number of the last event that was checked, so the client can page forward until no events are returned.
+
+        Parameters:
+            collection_name (String): The name of the collection.
+            cursor (Tuple): The generation and the sequence number of the last event received by the client.
+            key_range (Tuple): The lowest and the highest key (inclusive) of the events that will be returned. If None, all the events are returned.
+
+        Returns:
+            Response(success=True, message=None, collection_name=THE GIVEN COLLECTION NAME, data={"generation": ..., "sequence": ..., "events": [(...)]}): If the watch action was succesful. Note: The events list will contain (sequence, action, key, value) tuples, the action being "add" or "delete". The sequence is the one from which the client should continue watching.
+            Response(success=False, message=Events are no longer available., collection_name=None, data=None): If the generation is not the current one or some of the events after the given sequence number were dropped from the change log.
+            Response(success=False, message=Invalid cursor., collection_name=None, data=None): If the cursor is not a (generation, sequence number) tuple, e.g. the generation is missing.
+            Response(success=False, message=Invalid key range., collection_name=None, data=None): If the key range is not a (lowest key, highest key) tuple.
+            Response(success=False, message=Collection does not exist., collection_name=None, data=None): If the collection does not exist.
+        """
+        if not self._collection_exists(collection_name):
+            return self._send_error("Collection does not exist.")
+
+        change_log = self.change_logs[collection_name]
+        generation = self.generations[collection_name]
+        latest_sequence = self.sequences[collection_name]
+        if cursor is None:
+            return Response(True, None, collection_name, {"generation": generation, "sequence": latest_sequence, "events": []})
+
+        if not isinstance(cursor, tuple) or len(cursor) != 2 or not isinstance(cursor[0], str) or not isinstance(cursor[1], int):
+            return self._send_error("Invalid cursor.")
+
+        if key_range is not None and (not isinstance(key_range, tuple) or len(key_range) != 2):
+            return self._send_error("Invalid key range.")
+
+        sequence = cursor[1]
+        oldest_sequence = change_log[0][0] if change_log else latest_sequence + 1
+        if cursor[0] != generation or sequence > latest_sequence or sequence + 1 < oldest_sequence:
+            return self._send_error("Events are no longer available.")
+
+        events = []
+        for event in islice(change_log, sequence + 1 - oldest_sequence, None):
+            if len(events) == self.watch_batch_size:
+                break
+            sequence = event[0]
+            try:
+                if key_range is None or key_range[0] <= event[2] <= key_range[1]:
+                    events.append(event)
+            except TypeError:  # the key can not be compared to the range
+                pass
+
+        return Response(True, None, collection_name, {"generation": generation, "sequence": sequence, "events": events})
+
+    def _create_change_log(self, collection_name):
+        """
+        The method creates an empty change log, with a new generation, for the given collection.
+        When the change log is full, the oldest event is dropped, so that a slow client never blocks the writes.
+
+        Parameters:
+            collection_name: The name of the collection.
+        """
+        self.change_logs[collection_name] = deque(maxlen=self.change_log_size)
+        self.sequences[collection_name] = 0
+        self.generations[collection_name] = uuid.uuid4().hex
+
+    def _log_change(self, action, key, value, collection_name):
+        """
+        The method adds an event to the change log of the given collection.
+
+        Parameters:
+            action (String): The action that changed the collection. Can be "add" or "delete".
+            key: The key of the database entry.
+            value: The value of the database entry. Note: None for the "delete" action.
+            collection_name: The name of the collection.
+        """
+        self.sequences[collection_name] += 1
+        self.change_logs[collection_name].append(
+            (self.sequences[collection_name], action, key, value))
 
     def _send_error(self, description):
         """
@@ -471,8 +841,17 @@ class Server():
             self.collection_names = config.get(
                 "database", "collections").split(",")
             self.snapshot_interval = int(config.get("snapshot", "interval"))
+            self.text_index_names = config.get(
+                "database", "text_indexes", fallback="").split(",")
+            self.change_log_size = int(config.get(
+                "watch", "buffer_size", fallback="1000"))
+            self.watch_batch_size = int(config.get(
+                "watch", "batch_size", fallback="20"))
         except:
             self.host = "127.0.0.1"
             self.port = 65535
             self.collection_names = []
             self.snapshot_interval = 60
+            self.text_index_names = []
+            self.change_log_size = 1000
+            self.watch_batch_size = 20
@@ -0,0 +1,176 @@
+from bisect import bisect_left, insort
+from collections import defaultdict
+from itertools import count
+
+
+class TextIndex():
+    """
+    This is a class for indexing the string values of a collection, in order to speed up the "contains" and "startswith" queries.
+    It is maintained incrementally, every time an entry is added to or deleted from its collection.
+    It only narrows down the entries that might match a query, the candidates still have to be verified against the query.
+
+    Functionalities:
+        - Keeps a trigram inverted index (trigram -> keys) used by the "contains" queries.
+        - Keeps a sorted list of the distinct string values used by the "startswith" queries.
+        - Keeps track of the entries whose values are not strings, so that they are always returned as candidates.
+        - Keeps the insertion position of every key, so that the candidates are returned in the collection's order.
+
+    Attributes:
+        trigrams (defaultdict): The dictionary mapping each trigram to the set of keys whose values contain it.
+        keys_by_value (defaultdict): The dictionary mapping each distinct string value to the set of keys that have it.
+        sorted_values (List): The sorted list of the distinct string values.
+        other_keys (Set): The keys whose values are not strings.
+        positions (dict): The dictionary mapping each key to its insertion position.
+
+    Tests:
+        >>> index = TextIndex({1: "Radu", 2: "Ramona", 3: ["Radu"]})
+        >>> index.candidates("contains", "adu")
+        [1, 3]
+        >>> index.candidates("startswith", "Ra")
+        [1, 2, 3]
+        >>> index.replace(2, "Ramona", "Ra")
+        >>> index.remove(1, "Radu")
+        >>> index.add(1, "Raul")
+        >>> index.candidates("contains", "Ra")
+        [2, 3, 1]
+    """
+
+    def __init__(self, collection):
+        """
+        The constructor for the text index class.
+
+        Parameters:
+            collection (dict): The collection whose entries will be indexed.
+        """
+        self.trigrams = defaultdict(set)
+        self.keys_by_value = defaultdict(set)
+        self.sorted_values = []
+        self.other_keys = set()
+        self.positions = {}
+        self._next_position = count()
+        for key, value in collection.items():
+            self.positions[key] = next(self._next_position)
+            self._index(key, value, False)
+        self.sorted_values = sorted(self.keys_by_value)
+
+    def add(self, key, value):
+        """
+        The method adds a new entry (Key-Value pair) to the index, after the existing ones.
+
+        Parameters:
+            key (Any hashable data type): The key of the entry.
+            value (Any data type): The value of the entry.
+        """
+        self.positions[key] = next(self._next_position)
+        self._index(key, value)
+
+    def replace(self, key, old_value, new_value):
+        """
+        The method replaces the value of an existing entry (Key-Value pair) in the index, keeping its position.
+
+        Parameters:
+            key (Any hashable data type): The key of the entry.
+            old_value (Any data type): The current value of the entry.
+            new_value (Any data type): The new value of the entry.
+        """
+        self._unindex(key, old_value)
+        self._index(key, new_value)
+
+    def remove(self, key, value):
+        """
+        The method removes an entry (Key-Value pair) from the index.
+
+        Parameters:
+            key (Any hashable data type): The key of the entry.
+            value (Any data type): The value of the entry.
+        """
+        self._unindex(key, value)
+        del self.positions[key]
+
+    def candidates(self, query_operator, query_value):
+        """
+        The method returns the keys of the entries that might match the given query.
+
+        Parameters:
+            query_operator (String): The query operator. Can be "contains" or "startswith".
+            query_value (String): The value on which the query is done.
+
+        Returns:
+           A list containing the keys of the candidate entries, in the collection's order.
+        """
+        if query_operator == "startswith":
+            keys = set()
+            position = bisect_left(self.sorted_values, query_value)
+            while position < len(self.sorted_values) and self.sorted_values[position].startswith(query_value):
+                keys.update(self.keys_by_value[self.sorted_values[position]])
+                position += 1
+        elif len(query_value) < 3:  # too short to use the trigrams
+            keys = set()
+            for value, value_keys in self.keys_by_value.items():
+                if query_value in value:
+                    keys.update(value_keys)
+        else:
+            postings = sorted((self.trigrams.get(trigram, set())
+                               for trigram in self._trigrams(query_value)), key=len)
+            keys = set.intersection(*postings)
+
+        return sorted(keys | self.other_keys, key=self.positions.__getitem__)
+
+    def _index(self, key, value, keep_sorted=True):
+        """
+        The method adds the given value to the trigrams and the sorted values, or to the other keys if it is not a string.
+
+        Parameters:
+            key (Any hashable data type): The key of the entry.
+            value (Any data type): The value of the entry.
+            keep_sorted (Bool): If False, the value is not inserted into the sorted values. Note: Used when building the index, which sorts all the values once at the end.
+        """
+        if not isinstance(value, str):
+            self.other_keys.add(key)
+            return
+
+        for trigram in self._trigrams(value):
+            self.trigrams[trigram].add(key)
+
+        if keep_sorted and value not in self.keys_by_value:
+            insort(self.sorted_values, value)
+        self.keys_by_value[value].add(key)
+
+    def _unindex(self, key, value):
+        """
+        The method removes the given value from the trigrams and the sorted values, or from the other keys if it is not a string.
+
+        Parameters:
+            key (Any hashable data type): The key of the entry.
+            value (Any data type): The value of the entry.
+        """
+        if not isinstance(value, str):
+            self.other_keys.discard(key)
+            return
+
+        for trigram in self._trigrams(value):
+            self.trigrams[trigram].discard(key)
+            if not self.trigrams[trigram]:
+                del self.trigrams[trigram]
+
+        self.keys_by_value[value].discard(key)
+        if not self.keys_by_value[value]:
+            del self.keys_by_value[value]
+            del self.sorted_values[bisect_left(self.sorted_values, value)]
+
+    def _trigrams(self, value):
+        """
+        The method splits the given string into its distinct trigrams.
+
+        Parameters:
+            value (String): The string that will be split.
+
+        Returns:
+           A set containing the trigrams of the string.
+        """
+        return {value[i:i + 3] for i in range(len(value) - 2)}
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()